@@ -1,17 +1,40 @@
+import atexit
+import errno
+import functools
 import json
+import logging
 import os
-import subprocess
+import queue
+import random
+import shutil
+import signal
 import sys
 import time
 import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
 from threading import Lock
+from urllib.parse import urlparse
 
 import schedule
 from colorama import Fore, Style, init
 from dotenv import load_dotenv
 from instagrapi import Client
+from instagrapi.exceptions import ClientIncompleteReadError, ClientThrottledError
 from instagrapi.types import Media
+from requests.adapters import HTTPAdapter
+
+try:
+    import orjson  # Optional: faster JSON for history and cookies
+except ImportError:
+    orjson = None
+
+try:
+    from PIL import Image  # Converts downloaded photos that are not JPEG
+except ImportError:
+    Image = None  # Reported by check_dependencies
 
 # Initialize colorama
 init()
@@ -23,130 +46,379 @@ PASSWORD = os.getenv("INSTAGRAM_PASSWORD")
 REPOST_CAPTION = os.getenv("REPOST_CAPTION", "Reposted")
 CHECK_INTERVAL = int(os.getenv("CHECK_INTERVAL_MINUTES", 30))
 HISTORY_FILE = os.getenv("HISTORY_FILE", "repost_history.json")
-MEDIA_FOLDER = os.getenv("MEDIA_FOLDER", "instagram_media")
 COOKIES_FILE = os.getenv("COOKIES_FILE", "instagram_cookies.json")
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", 3))  # Number of parallel workers
 # Option to keep downloaded media files instead of deleting them
 KEEP_MEDIA = os.getenv("KEEP_MEDIA", "False").lower() in ("true", "1", "yes")
+# Opt-in: stage media that is deleted after upload in RAM-backed /dev/shm (often only 64 MiB in Docker)
+USE_TMPFS = os.getenv("USE_TMPFS", "False").lower() in ("true", "1", "yes")
+DEFAULT_MEDIA_FOLDER = "/dev/shm/insta_media" if USE_TMPFS and not KEEP_MEDIA and os.path.isdir("/dev/shm") else "instagram_media"
+MEDIA_FOLDER = os.getenv("MEDIA_FOLDER", DEFAULT_MEDIA_FOLDER)
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # Copy buffer for streamed video downloads (1 MiB)
+IMAGE_EXTENSIONS = frozenset((".jpg", ".jpeg", ".png", ".webp"))  # Photo formats accepted for upload
+VIDEO_EXTENSIONS = frozenset((".mp4",))
+UNSAVE_WORKERS = 2  # Parallel connections used to unsave reposted posts after a check
+UNSAVE_MAX_ATTEMPTS = 3  # Failed unsaves of one post before it is left saved
+CLEANUP_RETRY_DELAYS = (0.1, 0.5, 2.0)  # Seconds between background retries of locked file removals
+# Only print warnings and errors
+QUIET = os.getenv("QUIET", "False").lower() in ("true", "1", "yes")
+# MEDIA_FOLDER is its own volume, so filesystem usage can stand in for walking the folder
+USE_STATVFS = os.getenv("USE_STATVFS", "False").lower() in ("true", "1", "yes") and hasattr(os, "statvfs")
+LOG_FILE = os.getenv("LOG_FILE", "reposter.log")  # Rotating log file; empty disables file logging
 
 # Create media folder if it doesn't exist
 os.makedirs(MEDIA_FOLDER, exist_ok=True)
 
+
+def mount_http_pool(ig_client, pool_connections=10, pool_maxsize=20):
+    """Mount a keep-alive connection pool on the client's HTTP sessions so TLS handshakes are reused."""
+    for session in (getattr(ig_client, "private", None), getattr(ig_client, "public", None)):
+        if session is not None:
+            # Keep instagrapi's Retry strategy (429/5xx backoff) from the adapter being replaced
+            retries = session.get_adapter("https://").max_retries
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retries)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+
+class ReposterClient(Client):
+    """instagrapi Client that streams photo and video downloads over its pooled session with a large buffer"""
+
+    def video_download_by_url(self, url, filename="", folder="", overwrite=True):
+        """Download a video URL to folder"""
+        return self._download_by_url(url, filename, folder, overwrite)
+
+    def photo_download_by_url(self, url, filename="", folder="", overwrite=True):
+        """Download a photo URL to folder"""
+        return self._download_by_url(url, filename, folder, overwrite)
+
+    def _download_by_url(self, url, filename, folder, overwrite):
+        """Download a media URL to folder, copying the response in DOWNLOAD_CHUNK_SIZE blocks and fsyncing it"""
+        url = str(url)
+        fname = urlparse(url).path.rsplit("/", 1)[1]
+        filename = f"{filename}.{fname.rsplit('.', 1)[1]}" if filename else fname
+        path = Path(folder) / filename
+        if path.exists() and not overwrite:
+            return path.resolve()
+        # Stream to a .part file so a killed download never leaves a truncated file under the final name
+        part_path = path.with_suffix(".part")
+        try:
+            with self.public.get(url, stream=True, timeout=self.request_timeout) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                with open(part_path, "wb") as f:
+                    shutil.copyfileobj(response.raw, f, length=DOWNLOAD_CHUNK_SIZE)
+                    # A dropped connection ends the copy early instead of raising
+                    expected_length = response.headers.get("Content-Length")
+                    if expected_length and expected_length.isdigit() and f.tell() != int(expected_length):
+                        raise ClientIncompleteReadError(
+                            f"Broken file {path} (Content-length={expected_length}, but file length={f.tell()})"
+                        )
+                    # Make sure the file is on disk before it is handed to the uploader
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(part_path, path)
+        except Exception:
+            part_path.unlink(missing_ok=True)
+            raise
+        return path.resolve()
+
+
 # Create Instagram client with better timeout settings
-client = Client()
+client = ReposterClient()
 client.request_timeout = 30  # Increase default timeout to 30 seconds
+mount_http_pool(client)
 client.logger.setLevel("INFO")  # Set logging level
 
 saved_posts_history = set()
+history_snapshot = frozenset()  # Read-only copy of saved_posts_history for lock-free membership checks
 history_lock = Lock()  # Lock for thread-safe history updates
+history_loaded = False  # Set once load_history() has read HISTORY_FILE
+_last_cookies_hash = None  # Hash of the last cookies written to/read from COOKIES_FILE
+check_lock = Lock()  # Held while a check_and_repost run is in progress
+shutdown_event = threading.Event()  # Set on SIGTERM; wakes and stops the main loop
+memory_manager = None  # MemoryManager watching MEDIA_FOLDER, once started
+pending_unsaves = deque()  # Reposted media ids waiting to be removed from saved posts
+unsave_requeued = set()  # Already-reposted saved posts queued for unsaving once this run
+unsave_failures = {}  # Media id -> failed unsave attempts
+cleanup_queue = queue.Queue()  # Media files whose removal is retried in the background
+repost_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="repost")  # Shared by every check
+last_saved_posts_method = None  # Name of the get_saved_posts method that last succeeded
+collection_ids = {}  # Saved collection name -> id, resolved once via client.collections()
+COLLECTIONS_TTL = 600  # Seconds the client.collections() listing is reused
+pending_history = deque()  # Reposted media ids not yet appended to HISTORY_FILE
+history_ready = threading.Condition()  # Wakes the history writer when ids are queued
+HISTORY_FLUSH_INTERVAL = 2  # Seconds the history writer waits to coalesce ids into one append
+HISTORY_FLUSH_BATCH = 32  # Queued ids that trigger an append without waiting
+history_file_lock = Lock()  # Serializes appends to HISTORY_FILE
+history_fh = None  # HISTORY_FILE opened for appending on the first flush, reset by compaction
+persist_queue = queue.Queue()  # Write-behind jobs (history/cookies) for the persistence thread
+pending_persist_jobs = set()  # Jobs already queued, so bursts collapse into one write
+persist_lock = Lock()
 
 # Initialize MoviePy status
-MOVIEPY_AVAILABLE = False
+MOVIEPY_AVAILABLE = None  # Unknown until the first video repost probes for moviepy
+_moviepy = None  # moviepy.editor, imported on first video repost
+
+
+SUCCESS = 25  # Log level between INFO and WARNING for completed reposts
+logging.addLevelName(SUCCESS, "SUCCESS")
+
+# Pre-built console prefixes per log level
+LEVEL_PREFIXES = {
+    logging.DEBUG: f"{Fore.BLUE}[DEBUG]{Style.RESET_ALL} ",
+    logging.INFO: f"{Fore.CYAN}[INFO]{Style.RESET_ALL} ",
+    SUCCESS: f"{Fore.GREEN}[SUCCESS]{Style.RESET_ALL} ",
+    logging.WARNING: f"{Fore.YELLOW}[WARNING]{Style.RESET_ALL} ",
+    logging.ERROR: f"{Fore.RED}[ERROR]{Style.RESET_ALL} ",
+}
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Format records as the colored [LEVEL] message lines the console has always shown"""
+
+    def format(self, record):
+        return LEVEL_PREFIXES.get(record.levelno, "") + record.getMessage()
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record):
+        # The stock prepare() formats the message on the calling thread; our messages are
+        # f-strings or plain args, so the record can be formatted later as it is
+        return record
+
+
+logger = logging.getLogger("insta_reposter")
+logger.setLevel(logging.DEBUG)
+logger.propagate = False
+console_handler = logging.StreamHandler(sys.stdout)
+console_handler.setFormatter(ConsoleFormatter())
+console_handler.setLevel(logging.WARNING if QUIET else logging.DEBUG)
+log_handlers = [console_handler]
+if LOG_FILE:
+    # delay: the file is only created once the first buffered batch is written
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=10 << 20, backupCount=3, encoding="utf-8", delay=True)
+    file_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(threadName)s %(message)s"))
+    # Buffer file writes and flush them in batches, or immediately on errors
+    log_handlers.append(MemoryHandler(100, flushLevel=logging.ERROR, target=file_handler))
+# Callers only enqueue records; a listener thread does the console and file writes
+log_queue = queue.SimpleQueue()
+logger.addHandler(DeferredQueueHandler(log_queue))
+log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 
+def log_info(message, *args):
+    logger.info(message, *args)
 
-def log_info(message):
-    print(f"{Fore.CYAN}[INFO]{Style.RESET_ALL} {message}")
 
+def log_success(message, *args):
+    logger.log(SUCCESS, message, *args)
 
-def log_success(message):
-    print(f"{Fore.GREEN}[SUCCESS]{Style.RESET_ALL} {message}")
 
+def log_warning(message, *args):
+    logger.warning(message, *args)
 
-def log_warning(message):
-    print(f"{Fore.YELLOW}[WARNING]{Style.RESET_ALL} {message}")
 
+def log_error(message, *args):
+    logger.error(message, *args)
 
-def log_error(message):
-    print(f"{Fore.RED}[ERROR]{Style.RESET_ALL} {message}")
 
+def log_exception(message, *args):
+    """Log an error together with the traceback of the exception being handled"""
+    logger.exception(message, *args)
 
-def log_debug(message):
-    print(f"{Fore.BLUE}[DEBUG]{Style.RESET_ALL} {message}")
+
+def log_debug(message, *args):
+    logger.debug(message, *args)
 
 
 def check_dependencies():
-    """Check and install required dependencies."""
-    global MOVIEPY_AVAILABLE
-    try:
-        # Try to import required packages
+    """Check that required dependencies are installed; moviepy is checked on the first video."""
+    if Image is None:
+        log_error("Missing dependencies: PIL")
+        log_warning("Please install required dependencies with:")
+        log_info("pip install -r requirements.txt")
+        return False
+
+    log_success("All dependencies verified!")
+    return True
+
+
+def get_moviepy():
+    """Import moviepy.editor on first use; returns None if it cannot be imported."""
+    global _moviepy, MOVIEPY_AVAILABLE
+    if MOVIEPY_AVAILABLE is None:
         try:
-            import moviepy.editor
-            from PIL import Image  # Add PIL import check
-            
+            import moviepy.editor as moviepy_editor
+            _moviepy = moviepy_editor
             MOVIEPY_AVAILABLE = True
-            log_success("All dependencies successfully imported!")
         except ImportError as e:
-            log_warning(f"Dependency import failed: {e}. Installing required packages...")
-            
-            # Install required packages
-            packages = [
-                ("moviepy", "1.0.3"),
-                ("Pillow", "latest")  # Add PIL package
-            ]
-            
-            for package, version in packages:
-                try:
-                    if version == "latest":
-                        subprocess.check_call([sys.executable, "-m", "pip", "install", package])
-                    else:
-                        subprocess.check_call([sys.executable, "-m", "pip", "install", f"{package}=={version}"])
-                except Exception as install_error:
-                    log_error(f"Failed to install {package}: {install_error}")
-                    return False
+            log_warning(f"Failed to import moviepy, videos will be skipped: {e}")
+            log_info("pip install -r requirements.txt")
+            MOVIEPY_AVAILABLE = False
+    return _moviepy
 
-        log_success("All dependencies verified!")
-        return True
-    except Exception as e:
-        log_error(f"Error checking/installing dependencies: {e}")
-        log_warning("Please manually install required dependencies with:")
-        log_info("pip install moviepy==1.0.3")
-        return False
+
+def json_dumps(obj, sort_keys=False):
+    """Serialize obj to a JSON string, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+    return json.dumps(obj, sort_keys=sort_keys)
+
+
+def json_loads(data):
+    """Parse a JSON string or bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
 def load_history():
-    """Load repost history from JSON file."""
-    global saved_posts_history
+    """Load repost history from the append-only history file (one JSON id per line)."""
+    global saved_posts_history, history_snapshot, history_loaded
     try:
         if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, "r") as f:
-                saved_posts_history = set(json.load(f))
+            # Read raw bytes; both json backends parse UTF-8 bytes without a separate decode pass
+            with open(HISTORY_FILE, "rb") as f:
+                content = f.read()
+            if content.lstrip().startswith(b"["):
+                # Legacy format: the whole history as a single JSON list
+                saved_posts_history = set(json_loads(content))
+                compact_history()
+            else:
+                # Parse every line in a single json_loads call instead of one call per id
+                lines = [line for line in content.splitlines() if line.strip()]
+                try:
+                    entries = json_loads(b"[" + b",".join(lines) + b"]")
+                    malformed = 0
+                except ValueError:
+                    # A crash mid-append can leave a torn line; keep every line that still parses
+                    entries = []
+                    for line in lines:
+                        try:
+                            entries.append(json_loads(line))
+                        except ValueError:
+                            log_warning("Skipping malformed history line: %r", line)
+                    malformed = len(lines) - len(entries)
+                saved_posts_history = set(entries)
+                if malformed or len(entries) > 2 * len(saved_posts_history):
+                    compact_history()
             log_info(f"Loaded {len(saved_posts_history)} posts from history file.")
         else:
             saved_posts_history = set()
             log_info("No history file found. Starting with empty history.")
+        history_loaded = True
     except Exception as e:
         log_error(f"Error loading history file: {e}")
         saved_posts_history = set()
+    history_snapshot = frozenset(saved_posts_history)
 
 
-def save_history():
-    """Save repost history to JSON file."""
-    try:
-        with open(HISTORY_FILE, "w") as f:
-            json.dump(list(saved_posts_history), f)
-        log_info(f"Saved {len(saved_posts_history)} posts to history file.")
-    except Exception as e:
-        log_error(f"Error saving history file: {e}")
+def save_history(media_id):
+    """Queue a reposted media id for the history writer thread."""
+    with history_ready:
+        pending_history.append(media_id)
+        history_ready.notify()
+
+
+def history_writer():
+    """Append queued history ids every HISTORY_FLUSH_INTERVAL seconds or HISTORY_FLUSH_BATCH ids."""
+    while True:
+        with history_ready:
+            history_ready.wait_for(lambda: pending_history)
+            history_ready.wait_for(lambda: len(pending_history) >= HISTORY_FLUSH_BATCH, timeout=HISTORY_FLUSH_INTERVAL)
+        flush_history()
+
+
+def flush_history():
+    """Append all queued media ids to the history file in a single write."""
+    global history_fh
+    with history_file_lock:
+        media_ids = []
+        while pending_history:
+            media_ids.append(pending_history.popleft())
+        if not media_ids:
+            return
+        try:
+            if history_fh is None:
+                history_fh = open(HISTORY_FILE, "a", buffering=8192)
+                if history_fh.tell() > 0:
+                    # Start on a fresh line so a torn last entry does not swallow the next id
+                    with open(HISTORY_FILE, "rb") as f:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            history_fh.write("\n")
+            history_fh.writelines(json_dumps(media_id) + "\n" for media_id in media_ids)
+            history_fh.flush()
+        except Exception as e:
+            # Put the ids back so the next flush retries them
+            pending_history.extendleft(reversed(media_ids))
+            log_error(f"Error saving history file: {e}")
+
+
+def compact_history():
+    """Rewrite the history file with exactly one line per reposted media id."""
+    global history_fh
+    with history_file_lock:
+        try:
+            tmp_path = f"{HISTORY_FILE}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write("".join([json_dumps(media_id) + "\n" for media_id in saved_posts_history]))
+            os.replace(tmp_path, HISTORY_FILE)
+            # The open append handle still points at the replaced file
+            if history_fh is not None:
+                history_fh.close()
+                history_fh = None
+            log_info(f"Compacted history file to {len(saved_posts_history)} posts.")
+        except Exception as e:
+            log_error(f"Error compacting history file: {e}")
 
 
 def save_cookies():
-    """Save Instagram cookies to file."""
+    """Save Instagram cookies to file, skipping the write when they have not changed."""
+    global _last_cookies_hash
     try:
         cookies = client.get_settings()
+        serialized = json_dumps(cookies, sort_keys=True)
+        cookies_hash = hash(serialized)
+        if cookies_hash == _last_cookies_hash:
+            log_info("Cookies unchanged, skipping save.")
+            return
         with open(COOKIES_FILE, "w") as f:
-            json.dump(cookies, f)
+            f.write(serialized)
+        _last_cookies_hash = cookies_hash
         log_success("Cookies saved successfully!")
     except Exception as e:
         log_error(f"Error saving cookies: {e}")
 
 
+@functools.lru_cache(maxsize=1)
+def _read_cookies_file(path, mtime):
+    """Read the cookies file; cached per modification time so unchanged files are read once."""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def read_cookies():
+    """Return the parsed cookies file contents, or None if it does not exist."""
+    if not os.path.exists(COOKIES_FILE):
+        return None
+    # Parse on every call: clients keep and mutate the settings dict they are given
+    return json_loads(_read_cookies_file(COOKIES_FILE, os.path.getmtime(COOKIES_FILE)))
+
+
 def load_cookies():
     """Load Instagram cookies from file."""
+    global _last_cookies_hash
     try:
-        if os.path.exists(COOKIES_FILE):
-            with open(COOKIES_FILE, "r") as f:
-                cookies = json.load(f)
+        cookies = read_cookies()
+        if cookies is not None:
             client.set_settings(cookies)
+            _last_cookies_hash = hash(json_dumps(cookies, sort_keys=True))
             log_success("Cookies loaded successfully!")
             return True
         return False
@@ -155,6 +427,56 @@ def load_cookies():
         return False
 
 
+def close_history():
+    """Flush queued history writes and compact the history file on clean shutdown."""
+    if not history_loaded:
+        return  # Never overwrite the file with a history that was not loaded
+    flush_history()
+    with history_lock:
+        compact_history()
+
+
+def persist_async(job):
+    """Queue a persistence job for the background writer unless the same job is already queued."""
+    with persist_lock:
+        if job in pending_persist_jobs:
+            return
+        pending_persist_jobs.add(job)
+    persist_queue.put(job)
+
+
+def persist_worker():
+    """Run queued history/cookie writes off the repost path."""
+    while True:
+        job = persist_queue.get()
+        with persist_lock:
+            pending_persist_jobs.discard(job)
+        try:
+            job()
+        except Exception as e:
+            log_error(f"Error in background persistence: {e}")
+
+
+def flush_pending_writes():
+    """Run any persistence jobs still queued; registered to run at exit."""
+    while True:
+        try:
+            job = persist_queue.get_nowait()
+        except queue.Empty:
+            break
+        with persist_lock:
+            pending_persist_jobs.discard(job)
+        job()
+    flush_history()
+
+
+persist_thread = threading.Thread(target=persist_worker, name="persist-writer", daemon=True)
+persist_thread.start()
+history_thread = threading.Thread(target=history_writer, name="history-writer", daemon=True)
+history_thread.start()
+atexit.register(flush_pending_writes)
+
+
 def login():
     """Login to Instagram account using cookies if available, otherwise manual login."""
     try:
@@ -163,8 +485,8 @@ def login():
             try:
                 # Test if cookies are still valid using a simple API call
                 log_info("Testing saved cookies...")
-                # Use a simple API call that's less likely to fail
-                client.get_timeline_feed()
+                # A small current-user request; fetching the timeline here downloads a whole feed page
+                client.account_info()
                 log_success("Login successful using saved cookies!")
                 return True
             except Exception as e:
@@ -180,7 +502,7 @@ def login():
             log_success("Login successful!")
 
             # Save cookies after successful login
-            save_cookies()
+            persist_async(save_cookies)
             return True
         except Exception as e:
             if "challenge_required" in str(e):
@@ -193,7 +515,7 @@ def login():
                         USERNAME, PASSWORD, verification_code=verification_code
                     )
                     log_success("Login with verification successful!")
-                    save_cookies()
+                    persist_async(save_cookies)
                     return True
                 except Exception as verify_error:
                     log_error(f"Verification failed: {verify_error}")
@@ -206,14 +528,45 @@ def login():
         return False
 
 
+@functools.lru_cache(maxsize=1)
+def _fetch_collections(ttl_bucket):
+    """Fetch the account's saved collections; a new ttl_bucket forces a fresh request."""
+    return client.collections()
+
+
+def get_collections():
+    """Return the account's saved collections, cached for up to COLLECTIONS_TTL seconds."""
+    return _fetch_collections(int(time.monotonic() // COLLECTIONS_TTL))
+
+
+def first_collection_medias():
+    """Get the medias of the account's first saved collection, or None if it has none."""
+    collections = get_collections()
+    return client.collection_medias(collections[0].id) if collections else None
+
+
+def collection_medias_by_name(name):
+    """Get a collection's medias, resolving the collection name to its id only once."""
+    if name not in collection_ids:
+        for collection in get_collections():
+            collection_ids.setdefault(collection.name, collection.id)
+        if name not in collection_ids:
+            raise Exception(f"Collection {name!r} not found")
+    return client.collection_medias(collection_ids[name])
+
+
 def get_saved_posts():
     """Get user's saved posts using various methods with fallback."""
+    global last_saved_posts_method
     methods = [
-        ("All Posts collection", lambda: client.collection_medias_by_name("All Posts")),
-        ("Saved collection", lambda: client.collection_medias_by_name("Saved")),
-        ("First collection", lambda: client.collection_medias(client.collections()[0].id) if client.collections() else None),
+        ("All Posts collection", lambda: collection_medias_by_name("All Posts")),
+        ("Saved collection", lambda: collection_medias_by_name("Saved")),
+        ("First collection", first_collection_medias),
         ("Direct saved posts", lambda: client.user_saved_medias(client.user_id))
     ]
+    if last_saved_posts_method is not None:
+        # Start with the method that worked on the previous check
+        methods.sort(key=lambda method: method[0] != last_saved_posts_method)
 
     for method_name, fetch_method in methods:
         try:
@@ -221,6 +574,7 @@ def get_saved_posts():
             saved_posts = fetch_method()
             if saved_posts:
                 log_success(f"Successfully fetched {len(saved_posts)} posts from {method_name}")
+                last_saved_posts_method = method_name
                 return saved_posts
         except Exception as e:
             log_warning(f"Failed to get posts from {method_name}: {e}")
@@ -229,44 +583,151 @@ def get_saved_posts():
     return []
 
 
+def remove_file(path):
+    """Remove a file in one syscall; returns False only when it is locked and worth retrying later"""
+    try:
+        Path(path).unlink(missing_ok=True)
+    except OSError as file_error:
+        if file_error.errno in (errno.EACCES, errno.EBUSY, errno.EPERM):
+            return False  # Typically a Windows file lock held by the uploader
+        log_warning(f"Could not remove file {path}: {file_error}")
+    return True
+
 def handle_media_file(path, media_id, keep_media=False):
     """Common cleanup logic for media files"""
-    if not keep_media and path and os.path.exists(path):
-        for retry in range(3):
-            try:
-                os.remove(path)
-                break
-            except Exception as file_error:
-                log_warning(f"Attempt {retry + 1}: Could not remove file {path}: {file_error}")
-                time.sleep(2)
-        
-        # Handle thumbnail if exists
-        thumbnail_path = f"{path}.jpg"
-        if os.path.exists(thumbnail_path):
-            try:
-                os.remove(thumbnail_path)
-            except Exception as thumb_error:
-                log_warning(f"Could not remove thumbnail: {thumb_error}")
+    if not keep_media and path:
+        # Remove the media file and its thumbnail; files that are still locked
+        # are handed to the background cleaner instead of blocking the repost
+        for file_path in (path, f"{path}.jpg"):
+            if not remove_file(file_path):
+                log_warning(f"File {file_path} is locked. Retrying removal in background.")
+                cleanup_queue.put(file_path)
     elif keep_media and path:
         log_info(f"Keeping downloaded media at: {path}")
 
-def download_media(client, media_id, media_type, folder, max_retries=3):
-    """Download media with retry logic"""
-    for retry in range(max_retries):
+def remove_media_folder(folder):
+    """Delete a media download folder and everything in it with one scandir pass per directory"""
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    remove_media_folder(entry.path)
+                else:
+                    remove_file(entry.path)
+        os.rmdir(folder)
+    except FileNotFoundError:
+        pass
+    except OSError as folder_error:
+        log_warning(f"Could not remove media folder {folder}: {folder_error}")
+
+def remove_empty_folder(folder):
+    """Remove a per-media download folder once its files are gone"""
+    try:
+        os.rmdir(folder)
+    except OSError:
+        pass  # Already gone, or still holding a locked file the background cleaner will retry
+
+def cleanup_worker():
+    """Retry removal of locked media files that could not be deleted right away"""
+    while True:
+        file_path = cleanup_queue.get()
+        # Short backoff: most locks are released as soon as the uploader closes the file
+        for delay in CLEANUP_RETRY_DELAYS:
+            time.sleep(delay)
+            if remove_file(file_path):
+                break
+        else:
+            log_warning(f"Giving up removing locked file {file_path}")
+
+def backoff_delay(attempt, base=1.0, cap=60):
+    """Exponential backoff with jitter: base * 2^attempt plus up to base seconds, capped"""
+    return min(cap, base * (2 ** attempt) + random.uniform(0, base))
+
+def retry(times=3, base=1.0):
+    """Decorator that retries a failing call with exponential backoff, re-raising after the last attempt"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(times):
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if attempt == times - 1:
+                        raise
+                    # Throttling calls for a long pause; other failures are usually transient
+                    delay = backoff_delay(attempt + 3 if isinstance(e, ClientThrottledError) else attempt, base)
+                    log_warning(f"{func.__name__} attempt {attempt + 1} failed: {e}. Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
+        return wrapper
+    return decorator
+
+def find_downloaded_media(folder, extensions):
+    """Return a non-empty file with one of the given extensions left in folder by an earlier run"""
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions and entry.stat().st_size > 0:
+                    return entry.path
+    except FileNotFoundError:
+        pass
+    return None
+
+def ensure_folder(folder):
+    """Create folder with a single mkdir when its parent exists; returns True if it was newly created"""
+    try:
+        os.mkdir(folder)
+    except FileExistsError:
+        return False
+    except FileNotFoundError:
+        os.makedirs(folder, exist_ok=True)
+    return True
+
+def download_media(client, media_id, media_type, folder, url=None):
+    """Download media with retry logic, reusing a file already downloaded into folder"""
+    extensions = IMAGE_EXTENSIONS if media_type == 1 else VIDEO_EXTENSIONS
+    # A folder that already existed may hold a download from an earlier run
+    existing_path = None if ensure_folder(folder) else find_downloaded_media(folder, extensions)
+    if existing_path:
+        log_info(f"Reusing previously downloaded {'photo' if media_type == 1 else 'video'}: {existing_path}")
+        return existing_path
+
+    path = fetch_media(client, media_id, media_type, folder, url)
+    if memory_manager is not None:
+        memory_manager.record_bytes(os.path.getsize(path), path)
+    log_success(f"Downloaded {'photo' if media_type == 1 else 'video'}: {media_id}")
+    return path
+
+@retry()
+def fetch_media(client, media_id, media_type, folder, url=None):
+    """Download a photo or video into folder, straight from url when the listing provided one"""
+    if url:
+        # Skips the media_info lookup photo_download/video_download do just to find this URL
         try:
+            # Only photo_download/video_download carry the limiter wrapper; they call the
+            # *_by_url methods themselves, so throttle here rather than wrapping those too
+            MEDIA_RATE_LIMITER.wait()
             if media_type == 1:  # Photo
-                path = client.photo_download(media_id, folder=folder)
-            else:  # Video
-                path = client.video_download(media_id, folder=folder)
-            log_success(f"Downloaded {'photo' if media_type == 1 else 'video'}: {media_id}")
+                path = client.photo_download_by_url(url, str(media_id), folder)
+            else:
+                path = client.video_download_by_url(url, str(media_id), folder)
+            MEDIA_RATE_LIMITER.success()
             return path
         except Exception as e:
-            if retry < max_retries - 1:
-                log_warning(f"Download attempt {retry + 1} failed: {e}. Retrying in 5 seconds...")
-                time.sleep(5)
-            else:
-                raise
-    return None
+            MEDIA_RATE_LIMITER.failure()
+            log_warning(f"Direct download failed for {media_id}: {e}. Falling back to media lookup...")
+    if media_type == 1:  # Photo
+        return client.photo_download(media_id, folder=folder)
+    return client.video_download(media_id, folder=folder)
+
+def download_album_resource(client, media_id, index, resource, folder):
+    """Download a single album item into its own subfolder"""
+    resource_subfolder = os.path.join(folder, f"item_{index}")
+    try:
+        url = resource.thumbnail_url if resource.media_type == 1 else resource.video_url
+        return download_media(client, resource.pk, resource.media_type, resource_subfolder, url)
+    except Exception as e:
+        log_error(f"Failed to download resource {index} of album {media_id}: {e}")
+        return None
 
 def unsave_media(client, media_id):
     """Unsave media with proper logging"""
@@ -278,20 +739,84 @@ def unsave_media(client, media_id):
         log_error(f"Failed to delete post {media_id} from saved posts: {unsave_error}")
         return False
 
+
+def flush_unsaves():
+    """Unsave every reposted media queued during this check, split across two pooled connections."""
+    media_ids = []
+    while pending_unsaves:
+        media_ids.append(pending_unsaves.popleft())
+    if not media_ids:
+        return
+    log_info(f"Removing {len(media_ids)} reposted posts from saved posts")
+
+    def unsave_batch(batch):
+        """Unsave a batch on one pooled connection; returns the ids that are still saved"""
+        try:
+            pooled_client = connection_pool.get_connection()
+        except Exception as e:
+            log_error(f"No connection available to remove posts from saved posts: {e}")
+            return batch
+        failed = []
+        try:
+            for media_id in batch:
+                LIKE_RATE_LIMITER.wait()  # Unsaves are light actions, spaced like likes
+                if not unsave_media(pooled_client, media_id):
+                    failed.append(media_id)
+        finally:
+            connection_pool.release_connection(pooled_client)
+        return failed
+
+    # Instagram has no bulk unsave endpoint, so overlap the round-trips instead
+    batches = [media_ids[i::UNSAVE_WORKERS] for i in range(min(UNSAVE_WORKERS, len(media_ids)))]
+    with ThreadPoolExecutor(max_workers=len(batches), thread_name_prefix="unsave") as executor:
+        still_saved = [media_id for failed in executor.map(unsave_batch, batches) for media_id in failed]
+    for media_id in set(media_ids).difference(still_saved):
+        unsave_failures.pop(media_id, None)
+    retry_ids = []
+    for media_id in still_saved:
+        unsave_failures[media_id] = unsave_failures.get(media_id, 0) + 1
+        if unsave_failures[media_id] < UNSAVE_MAX_ATTEMPTS:
+            retry_ids.append(media_id)
+        else:
+            log_warning(f"Giving up on removing {media_id} from saved posts after {UNSAVE_MAX_ATTEMPTS} attempts")
+    if retry_ids:
+        # Put them back so the next flush retries them
+        pending_unsaves.extendleft(reversed(retry_ids))
+
+
+def finish_pending_work():
+    """Unsave reposted posts that are still queued and flush the history file before exiting."""
+    # Let running reposts finish so their history lines and unsaves are not lost
+    repost_executor.shutdown(wait=True, cancel_futures=True)
+    try:
+        flush_unsaves()
+    except Exception as e:
+        log_error(f"Error removing reposted posts from saved posts: {e}")
+    close_history()
+
+
 def validate_file_format(path):
     """Validate if file has supported image extension"""
-    valid_extensions = ('.jpg', '.jpeg', '.png', '.webp')
-    # Convert WindowsPath to string before calling lower()
-    path_str = str(path)
-    return path_str.lower().endswith(valid_extensions)
+    # Only the extension is lowercased; str() also accepts WindowsPath
+    return os.path.splitext(str(path))[1].lower() in IMAGE_EXTENSIONS
 
 def convert_to_jpg(input_path):
-    """Convert image to JPG format"""
-    from PIL import Image
+    """Convert image to JPG format, renaming instead when the file is already a JPEG"""
     try:
-        img = Image.open(input_path)
+        # instagrapi returns Path objects
+        input_path = str(input_path)
         jpg_path = input_path.rsplit('.', 1)[0] + '.jpg'
-        img.convert('RGB').save(jpg_path, 'JPEG')
+        with open(input_path, 'rb') as f:
+            head = f.read(3)
+        if head == b'\xff\xd8\xff':  # JPEG magic bytes: only the extension is wrong
+            os.replace(input_path, jpg_path)
+            log_success(f"Renamed JPEG to: {jpg_path}")
+            return jpg_path
+        with Image.open(input_path) as img:
+            # convert() copies the whole pixel buffer, even for images that are already RGB
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            img.save(jpg_path, 'JPEG', quality=95, optimize=False)
         log_success(f"Converted image to JPG: {jpg_path}")
         return jpg_path
     except Exception as e:
@@ -299,21 +824,29 @@ def convert_to_jpg(input_path):
         return None
 
 class RateLimiter:
-    """Simple rate limiter with exponential backoff"""
-    def __init__(self, initial_delay=1, max_delay=300, backoff_factor=2):
+    """Token-bucket rate limiter with exponential backoff"""
+    def __init__(self, initial_delay=1, max_delay=300, backoff_factor=2, capacity=1):
         self.initial_delay = initial_delay
         self.max_delay = max_delay
         self.backoff_factor = backoff_factor
-        self.current_delay = initial_delay
-        self.last_attempt = 0
+        self.current_delay = initial_delay  # Seconds to refill one token
+        self.capacity = capacity  # Calls allowed back to back after an idle period
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = Lock()
 
     def wait(self):
-        """Wait appropriate time between API calls"""
-        now = time.time()
-        time_since_last = now - self.last_attempt
-        if time_since_last < self.current_delay:
-            time.sleep(self.current_delay - time_since_last)
-        self.last_attempt = now
+        """Wait until a token is available, then take it"""
+        # Serialize waiters so tokens are handed out one at a time
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) / self.current_delay)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                time.sleep((1 - self.tokens) * self.current_delay)
 
     def success(self):
         """Reset delay on successful API call"""
@@ -323,8 +856,9 @@ class RateLimiter:
         """Increase delay on API failure"""
         self.current_delay = min(self.current_delay * self.backoff_factor, self.max_delay)
 
-# Create rate limiter instances for different API operations
-POST_RATE_LIMITER = RateLimiter(initial_delay=2)
+# Create rate limiter instances for different API operations; Instagram throttles
+# uploads per account, so every upload type shares one bucket
+POST_RATE_LIMITER = RateLimiter(initial_delay=2, capacity=2)
 LIKE_RATE_LIMITER = RateLimiter(initial_delay=1)
 MEDIA_RATE_LIMITER = RateLimiter(initial_delay=5)
 
@@ -347,33 +881,27 @@ def with_rate_limit(func, rate_limiter):
                     raise
     return wrapper
 
-# Apply rate limiting to Instagram client methods
-client.photo_upload = with_rate_limit(client.photo_upload, POST_RATE_LIMITER)
-client.video_upload = with_rate_limit(client.video_upload, POST_RATE_LIMITER)
-client.clip_upload = with_rate_limit(client.clip_upload, POST_RATE_LIMITER)
-client.igtv_upload = with_rate_limit(client.igtv_upload, POST_RATE_LIMITER)
-client.album_upload = with_rate_limit(client.album_upload, POST_RATE_LIMITER)
-client.media_like = with_rate_limit(client.media_like, LIKE_RATE_LIMITER)
-client.photo_download = with_rate_limit(client.photo_download, MEDIA_RATE_LIMITER)
-client.video_download = with_rate_limit(client.video_download, MEDIA_RATE_LIMITER)
-
 class SessionManager:
     """Manages Instagram session and handles automatic refresh"""
     def __init__(self, client, refresh_interval=3600):  # 1 hour default
         self.client = client
         self.refresh_interval = refresh_interval
-        self.last_refresh = 0
+        self.last_refresh = float("-inf")  # time.monotonic() of the last successful check
         self._lock = Lock()
 
     def refresh_if_needed(self):
         """Refresh session if interval has passed"""
+        # Lock-free fast path: uploads only serialize when a refresh is actually due
+        if time.monotonic() - self.last_refresh <= self.refresh_interval:
+            return
         with self._lock:
-            now = time.time()
+            now = time.monotonic()
+            # Another thread may have refreshed while we waited for the lock
             if now - self.last_refresh > self.refresh_interval:
                 try:
                     log_info("Refreshing Instagram session...")
                     # Try to make a simple API call to test session
-                    self.client.get_timeline_feed()
+                    self.client.account_info()
                     self.last_refresh = now
                     log_success("Session is still valid")
                 except Exception as e:
@@ -381,6 +909,9 @@ class SessionManager:
                     try:
                         # Try to relogin
                         if login():
+                            if self.client is not client:
+                                # login() re-authenticates the global client; pooled clients copy its session
+                                self.client.set_settings(client.get_settings())
                             self.last_refresh = now
                             log_success("Successfully refreshed session")
                         else:
@@ -395,43 +926,69 @@ class SessionManager:
             return func(*args, **kwargs)
         return wrapper
 
-# Create session manager instance
-session_manager = SessionManager(client)
-
-# Apply session refresh to critical API operations
-client.photo_upload = session_manager.with_session_refresh(client.photo_upload)
-client.video_upload = session_manager.with_session_refresh(client.video_upload)
-client.clip_upload = session_manager.with_session_refresh(client.clip_upload)
-client.igtv_upload = session_manager.with_session_refresh(client.igtv_upload)
-client.album_upload = session_manager.with_session_refresh(client.album_upload)
+def apply_client_wrappers(ig_client):
+    """Apply the shared rate limiters and session refresh to a client's API methods"""
+    # Apply rate limiting to Instagram client methods
+    ig_client.photo_upload = with_rate_limit(ig_client.photo_upload, POST_RATE_LIMITER)
+    ig_client.video_upload = with_rate_limit(ig_client.video_upload, POST_RATE_LIMITER)
+    ig_client.clip_upload = with_rate_limit(ig_client.clip_upload, POST_RATE_LIMITER)
+    ig_client.igtv_upload = with_rate_limit(ig_client.igtv_upload, POST_RATE_LIMITER)
+    ig_client.album_upload = with_rate_limit(ig_client.album_upload, POST_RATE_LIMITER)
+    ig_client.media_like = with_rate_limit(ig_client.media_like, LIKE_RATE_LIMITER)
+    ig_client.photo_download = with_rate_limit(ig_client.photo_download, MEDIA_RATE_LIMITER)
+    ig_client.video_download = with_rate_limit(ig_client.video_download, MEDIA_RATE_LIMITER)
+    
+    # Apply session refresh to critical API operations
+    manager = SessionManager(ig_client)
+    ig_client.photo_upload = manager.with_session_refresh(ig_client.photo_upload)
+    ig_client.video_upload = manager.with_session_refresh(ig_client.video_upload)
+    ig_client.clip_upload = manager.with_session_refresh(ig_client.clip_upload)
+    ig_client.igtv_upload = manager.with_session_refresh(ig_client.igtv_upload)
+    ig_client.album_upload = manager.with_session_refresh(ig_client.album_upload)
+    return manager
+
+# Create session manager instance for the global client
+session_manager = apply_client_wrappers(client)
 
 class ConnectionPoolManager:
     """Manages a pool of Instagram API connections"""
     def __init__(self, min_connections=2, max_connections=5):
         self.min_connections = min_connections
         self.max_connections = max_connections
-        self._pool = []
-        self._in_use = {}
-        self._lock = Lock()
+        self._idle = queue.LifoQueue()  # Idle clients; LIFO hands out the most recently used session
+        self._all = []  # Every client owned by the pool
+        self._in_use = {}  # Checked-out client -> time.monotonic() it was handed out
+        self._lock = Lock()  # Guards _all and _in_use
+        self._grow_lock = Lock()  # Serializes pool growth so only one login prompt runs at a time
         
         # Only initialize one connection initially to avoid multiple 2FA prompts
         self._add_connection()
     
+    def _register(self, new_client):
+        """Add a client to the pool and mark it idle"""
+        with self._lock:
+            # login() hands back the global client, which may already be pooled
+            if new_client in self._all:
+                return
+            self._all.append(new_client)
+        self._idle.put(new_client)
+    
     def _add_connection(self):
         """Create a new Instagram client connection"""
         try:
-            new_client = Client()
+            new_client = ReposterClient()
             new_client.request_timeout = 30
+            mount_http_pool(new_client)
             
             # Try to load cookies first
-            if os.path.exists(COOKIES_FILE):
-                with open(COOKIES_FILE, "r") as f:
-                    cookies = json.load(f)
+            cookies = read_cookies()
+            if cookies is not None:
                 new_client.set_settings(cookies)
                 try:
                     # Test if cookies are valid
-                    new_client.get_timeline_feed()
-                    self._pool.append(new_client)
+                    new_client.account_info()
+                    apply_client_wrappers(new_client)
+                    self._register(new_client)
                     return new_client
                 except Exception:
                     pass  # If cookies fail, proceed with manual login
@@ -439,7 +996,7 @@ class ConnectionPoolManager:
             # If no valid cookies, use the main login function
             if login():
                 # After successful login, use the authenticated client from the main session
-                self._pool.append(client)  # Use the global client that was authenticated
+                self._register(client)  # Use the global client that was authenticated
                 return client
             else:
                 log_error("Failed to authenticate new connection")
@@ -451,54 +1008,47 @@ class ConnectionPoolManager:
     
     def get_connection(self, timeout=30):
         """Get an available connection from the pool"""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            with self._lock:
-                # Try to get an available connection
-                for client in self._pool:
-                    if client not in self._in_use:
-                        self._in_use[client] = time.time()
-                        return client
-                
-                # If no connection is available and we haven't reached max, create new one
-                if len(self._pool) < self.max_connections:
-                    new_client = self._add_connection()
-                    if new_client:
-                        self._in_use[new_client] = time.time()
-                        return new_client
-            
-            # Wait before trying again
-            time.sleep(1)
-        
-        raise TimeoutError("Could not get a connection from the pool")
+        try:
+            pooled_client = self._idle.get_nowait()
+        except queue.Empty:
+            # Grow the pool if allowed, then block until any client is released
+            with self._grow_lock:
+                if len(self._all) < self.max_connections:
+                    self._add_connection()
+            try:
+                pooled_client = self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("Could not get a connection from the pool")
+        with self._lock:
+            self._in_use[pooled_client] = time.monotonic()
+        return pooled_client
     
     def release_connection(self, client):
         """Release a connection back to the pool"""
         with self._lock:
-            if client in self._in_use:
-                del self._in_use[client]
+            if self._in_use.pop(client, None) is None or client not in self._all:
+                return  # Already released, or dropped as stale while checked out
+        self._idle.put(client)
     
     def cleanup_stale_connections(self, max_age=3600):
         """Remove stale connections from the pool"""
         with self._lock:
-            current_time = time.time()
-            stale_clients = []
+            current_time = time.monotonic()
             
-            # Identify stale connections
-            for client, start_time in self._in_use.items():
+            # Drop connections that have been checked out for too long
+            for client, start_time in list(self._in_use.items()):
                 if current_time - start_time > max_age:
-                    stale_clients.append(client)
-            
-            # Remove stale connections
-            for client in stale_clients:
-                if client in self._in_use:
                     del self._in_use[client]
-                if client in self._pool:
-                    self._pool.remove(client)
-            
-            # Ensure minimum connections are maintained
-            while len(self._pool) < self.min_connections:
+                    if client in self._all:
+                        self._all.remove(client)
+        
+        # Ensure minimum connections are maintained
+        with self._grow_lock:
+            while len(self._all) < self.min_connections:
+                pool_size = len(self._all)
                 self._add_connection()
+                if len(self._all) == pool_size:
+                    break  # Login failed or returned an already pooled client
 
 # Create connection pool manager instance
 connection_pool = ConnectionPoolManager()
@@ -516,16 +1066,128 @@ def cleanup_connections():
 cleanup_thread = threading.Thread(target=cleanup_connections, daemon=True)
 cleanup_thread.start()
 
+def repost_photo(client, media, caption, folder):
+    """Download, convert if needed and upload a photo post. Returns True on success."""
+    media_id = media.id
+    path = None
+    try:
+        path = download_media(client, media_id, 1, folder, media.thumbnail_url)
+        if not validate_file_format(path):
+            jpg_path = convert_to_jpg(path)
+            if jpg_path:
+                path = jpg_path
+            else:
+                raise Exception("Failed to convert image format")
+
+        client.photo_upload(path, caption)
+        log_success(f"Successfully uploaded photo: {media_id}")
+        return True
+    except Exception as e:
+        log_error(f"Error processing photo {media_id}: {e}")
+        return False
+    finally:
+        handle_media_file(path, media_id, KEEP_MEDIA)
+        if not KEEP_MEDIA:
+            remove_empty_folder(folder)
+
+
+# Upload call per video product type; anything else (e.g. "feed") is a regular video
+VIDEO_UPLOADERS = {
+    "igtv": lambda client, path, caption, media: client.igtv_upload(path, caption, media.title or "Reposted IGTV"),
+    "clips": lambda client, path, caption, media: client.clip_upload(path, caption),  # Reels
+}
+
+
+def upload_regular_video(client, path, caption, media):
+    """Upload a regular feed video"""
+    return client.video_upload(path, caption)
+
+
+def repost_video(client, media, caption, folder):
+    """Download and upload a video, IGTV or reel. Returns True on success."""
+    media_id = media.id
+    if get_moviepy() is None:
+        log_warning("MoviePy is not available. Skipping video...")
+        return False
+
+    path = None
+    try:
+        path = download_media(client, media_id, 2, folder, media.video_url)
+        uploader = VIDEO_UPLOADERS.get(media.product_type, upload_regular_video)
+        uploader(client, path, caption, media)
+        log_success(f"Successfully uploaded {media.product_type or 'video'}: {media_id}")
+        return True
+    except Exception as e:
+        log_error(f"Error processing video {media_id}: {e}")
+        return False
+    finally:
+        handle_media_file(path, media_id, KEEP_MEDIA)
+        if not KEEP_MEDIA:
+            remove_empty_folder(folder)
+
+
+def repost_album(client, media, caption, folder):
+    """Download every album item concurrently and upload them as one album. Returns True on success."""
+    media_id = media.id
+    resources = list(media.resources)
+    if any(resource.media_type == 2 for resource in resources) and get_moviepy() is None:
+        log_warning("MoviePy is not available. Skipping album containing videos...")
+        return False
+
+    try:
+        paths = []
+        if resources:
+            # Download all album items concurrently; map() keeps album order
+            with ThreadPoolExecutor(max_workers=min(len(resources), 4)) as executor:
+                results = executor.map(
+                    lambda item: download_album_resource(client, media_id, item[0], item[1], folder),
+                    enumerate(resources)
+                )
+                paths = [path for path in results if path]
+
+        if not paths:
+            log_warning("No valid media found in album")
+            return False
+
+        client.album_upload(paths, caption)
+        log_success(f"Successfully uploaded album: {media_id}")
+        return True
+    except Exception as e:
+        log_error(f"Error processing album {media_id}: {e}")
+        return False
+    finally:
+        if KEEP_MEDIA:
+            log_info(f"Keeping downloaded album at: {folder}")
+        else:
+            # Clears the item files, their thumbnails and the item subfolders
+            remove_media_folder(folder)
+
+
+# Repost handler per Instagram media_type: 1 = photo, 2 = video, 8 = album
+MEDIA_HANDLERS = {
+    1: repost_photo,
+    2: repost_video,
+    8: repost_album,
+}
+
+
 def repost_media(media: Media):
     """Repost media based on its type using connection pooling."""
+    global history_snapshot
     client = None
     media_id = media.id  # Define media_id at the start of the function
+    # check_and_repost filters reposted media already; this only guards direct calls
+    if media_id in history_snapshot:
+        log_info(f"Skipping already reposted media: {media_id}")
+        return
+
+    handler = MEDIA_HANDLERS.get(media.media_type)
+    if handler is None:
+        log_warning(f"Unsupported media type {media.media_type} for {media_id}. Skipping...")
+        return
+
     try:
         client = connection_pool.get_connection()
-        if media_id in saved_posts_history:
-            log_info(f"Skipping already reposted media: {media_id}")
-            return
-
         log_info(f"Processing media: {media_id}")
 
         # Like the post first
@@ -535,92 +1197,16 @@ def repost_media(media: Media):
         except Exception as e:
             log_error(f"Failed to like post {media_id}: {e}")
 
-        caption = f"{REPOST_CAPTION}\n\nOriginal by @{media.user.username}"
-        media_specific_folder = os.path.join(MEDIA_FOLDER, f"{media.user.username}_{media_id}")
-        os.makedirs(media_specific_folder, exist_ok=True)
-
-        repost_successful = False
+        username = media.user.username
+        caption = f"{REPOST_CAPTION}\n\nOriginal by @{username}"
+        media_specific_folder = os.path.join(MEDIA_FOLDER, f"{username}_{media_id}")
 
-        if media.media_type == 1:  # Photo
-            path = None
-            try:
-                path = download_media(client, media_id, 1, media_specific_folder)
-                if not validate_file_format(path):
-                    jpg_path = convert_to_jpg(path)
-                    if jpg_path:
-                        path = jpg_path
-                    else:
-                        raise Exception("Failed to convert image format")
-
-                time.sleep(2)  # Add delay before upload
-                client.photo_upload(path, caption)
-                log_success(f"Successfully uploaded photo: {media_id}")
-                repost_successful = True
-            except Exception as e:
-                log_error(f"Error processing photo {media_id}: {e}")
-            finally:
-                if repost_successful:
-                    unsave_media(client, media_id)
-                handle_media_file(path, media_id, KEEP_MEDIA)
-
-        elif media.media_type == 2:  # Video
-            if not MOVIEPY_AVAILABLE:
-                log_warning("MoviePy is not available. Skipping video...")
-                return
-
-            path = None
-            try:
-                path = download_media(client, media_id, 2, media_specific_folder)
-                time.sleep(2)
-
-                if not media.product_type:  # Regular video
-                    client.video_upload(path, caption)
-                elif media.product_type == "igtv":
-                    client.igtv_upload(path, caption, media.title or "Reposted IGTV")
-                elif media.product_type == "clips":  # Reels
-                    client.clip_upload(path, caption)
-                
-                log_success(f"Successfully uploaded {media.product_type or 'video'}: {media_id}")
-                repost_successful = True
-            except Exception as e:
-                log_error(f"Error processing video {media_id}: {e}")
-            finally:
-                if repost_successful:
-                    unsave_media(client, media_id)
-                handle_media_file(path, media_id, KEEP_MEDIA)
-
-        elif media.media_type == 8:  # Album
-            paths = []
-            try:
-                for i, resource in enumerate(media.resources):
-                    resource_subfolder = os.path.join(media_specific_folder, f"item_{i}")
-                    os.makedirs(resource_subfolder, exist_ok=True)
-                    
-                    try:
-                        path = download_media(client, resource.pk, resource.media_type, resource_subfolder)
-                        if path:
-                            paths.append(path)
-                    except Exception as e:
-                        log_error(f"Failed to download resource {i} of album {media_id}: {e}")
-
-                if paths:
-                    time.sleep(2)
-                    client.album_upload(paths, caption)
-                    log_success(f"Successfully uploaded album: {media_id}")
-                    repost_successful = True
-                else:
-                    log_warning("No valid media found in album")
-            except Exception as e:
-                log_error(f"Error processing album {media_id}: {e}")
-            finally:
-                if repost_successful:
-                    unsave_media(client, media_id)
-                for path in paths:
-                    handle_media_file(path, media_id, KEEP_MEDIA)
-
-        if repost_successful:
-            saved_posts_history.add(media_id)
-            save_history()
+        if handler(client, media, caption, media_specific_folder):
+            pending_unsaves.append(media_id)
+            with history_lock:
+                saved_posts_history.add(media_id)
+                history_snapshot = frozenset(saved_posts_history)
+                save_history(media_id)
             log_success(f"Successfully reposted {media_id}")
         else:
             log_warning(f"Repost of {media_id} was not successful. Not adding to history.")
@@ -689,7 +1275,7 @@ def check_and_repost():
                 log_warning(
                     f"API connectivity check failed, retry {retry + 1}/{max_api_retries}"
                 )
-                time.sleep(10)  # Wait before retry
+                time.sleep(backoff_delay(retry))  # Wait before retry
             else:
                 log_error(
                     "Cannot proceed with reposting due to API connectivity issues after retries"
@@ -711,13 +1297,13 @@ def check_and_repost():
                     log_warning(
                         f"No saved posts found, retry {retry + 1}/{max_saved_retries}"
                     )
-                    time.sleep(5)  # Wait before retry
+                    time.sleep(backoff_delay(retry))  # Wait before retry
             except Exception as e:
                 if retry < max_saved_retries - 1:
                     log_warning(
                         f"Error getting saved posts: {e}, retry {retry + 1}/{max_saved_retries}"
                     )
-                    time.sleep(5)  # Wait before retry
+                    time.sleep(backoff_delay(retry + 3 if isinstance(e, ClientThrottledError) else retry))
                 else:
                     raise
 
@@ -727,38 +1313,281 @@ def check_and_repost():
             log_info("No saved posts found to repost")
             return
 
-        # Filter out already reposted media
-        to_repost = [media for media in saved_medias if media.id not in saved_posts_history]
+        # Filter out already reposted media; the dict drops ids a fallback method returned twice
+        unique_medias = {media.id: media for media in saved_medias}
+        to_repost = [media for media_id, media in unique_medias.items() if media_id not in history_snapshot]
+        already_reposted = [media_id for media_id in unique_medias if media_id in history_snapshot]
+        if already_reposted:
+            log_info(f"Skipping {len(already_reposted)} saved posts that were already reposted")
+            # Still saved means an interrupted check reposted them without unsaving; queue each
+            # once per run so a post saved again on purpose is not unsaved on every check
+            requeue = [media_id for media_id in already_reposted if media_id not in unsave_requeued]
+            unsave_requeued.update(requeue)
+            pending_unsaves.extend(requeue)
         if not to_repost:
             log_info("All saved posts have already been reposted")
+            flush_unsaves()
             return
 
         log_info(f"Processing {len(to_repost)} saved posts in parallel with {MAX_WORKERS} workers")
 
-        # Use ThreadPoolExecutor for parallel processing
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            # Submit all tasks
-            future_to_media = {executor.submit(repost_media, media): media for media in to_repost}
-            
-            # Process completed tasks as they finish
-            for future in as_completed(future_to_media):
-                media = future_to_media[future]
-                try:
-                    future.result()  # This will raise any exceptions that occurred
-                except Exception as e:
-                    log_error(f"Error processing media {media.id}: {e}")
-                    import traceback
-                    log_error(f"Traceback: {traceback.format_exc()}")
+        # Submit all tasks to the long-lived repost worker pool
+        future_to_media = {repost_executor.submit(repost_media, media): media for media in to_repost}
+
+        # Process completed tasks as they finish
+        for future in as_completed(future_to_media):
+            media = future_to_media[future]
+            try:
+                future.result()  # This will raise any exceptions that occurred
+            except Exception as e:
+                log_exception("Error processing media %s: %s", media.id, e)
+            if shutdown_event.is_set():
+                # Leave queued reposts for the next run; running ones finish in finish_pending_work
+                for pending in future_to_media:
+                    pending.cancel()
+                break
+
+        flush_unsaves()
 
         log_info(f"Completed check. Next check in {CHECK_INTERVAL} minutes.")
     except Exception as e:
-        log_error(f"Error in check_and_repost: {e}")
-        import traceback
-        log_error(f"Traceback: {traceback.format_exc()}")
+        log_exception("Error in check_and_repost: %s", e)
+
+
+def run_check_in_background():
+    """Run check_and_repost on a worker thread so a slow download never stalls the scheduler."""
+    if not check_lock.acquire(blocking=False):
+        log_warning("Previous check is still running. Skipping this run.")
+        return
+
+    def run():
+        try:
+            check_and_repost()
+        finally:
+            check_lock.release()
+
+    threading.Thread(target=run, name="check-and-repost", daemon=True).start()
+
+
+class MemoryManager:
+    """Manages memory usage and cleanup of media files"""
+    def __init__(self, media_folder, max_folder_size_mb=500, min_interval=60, max_interval=3600, rescan_every=6):
+        self.media_folder = media_folder
+        self.max_folder_size_mb = max_folder_size_mb
+        self.min_interval = min_interval  # Seconds between checks while the folder is busy
+        self.max_interval = max_interval  # Seconds between checks while the folder is idle
+        self.rescan_every = rescan_every  # Passes between full rescans while the counter says under limit
+        self.last_size_mb = 0  # Folder size after the last cleanup pass
+        self._size_bytes = None  # Scanned size plus bytes downloaded since; None until the first scan
+        self._size_lock = Lock()  # Held only for counter updates
+        self._passes = 0
+        self._lock = Lock()  # Held for a whole cleanup pass
+        self._wakeup = threading.Event()  # Set by record_bytes when the folder nears its limit
+        self._index_path = os.path.join(media_folder, "sizes.json")
+        self._sizes = self._load_index()  # Top-level media folder -> bytes, so known folders are never re-walked
+
+    def _load_index(self):
+        """Load the per-folder size index saved by the previous cleanup pass"""
+        try:
+            with open(self._index_path, "rb") as f:
+                return json_loads(f.read())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        """Persist the per-folder size index"""
+        with self._size_lock:
+            serialized = json_dumps(self._sizes)
+        try:
+            with open(self._index_path, "w") as f:
+                f.write(serialized)
+        except OSError as e:
+            log_warning(f"Could not save media size index: {e}")
+
+    def _top_folder(self, path):
+        """Return the top-level media subfolder that contains path"""
+        relative = os.path.relpath(path, self.media_folder)
+        return os.path.join(self.media_folder, relative.split(os.sep, 1)[0])
+
+    def record_bytes(self, size, path=None):
+        """Count bytes downloaded into the media folder since the last scan"""
+        with self._size_lock:
+            if self._size_bytes is not None:
+                self._size_bytes += size
+                # Wake the monitor instead of waiting for its next poll
+                if self._size_bytes > 0.9 * self.max_folder_size_mb * 1024 * 1024:
+                    self._wakeup.set()
+            if path is not None:
+                folder = self._top_folder(path)
+                self._sizes[folder] = self._sizes.get(folder, 0) + size
+
+    def get_folder_size(self, folder):
+        """Get total size of folder in MB"""
+        return self._dir_size_bytes(folder) / (1024 * 1024)  # Convert to MB
+
+    def _dir_size_bytes(self, folder):
+        """Sum the sizes of the files under folder with one scandir pass per directory, skipping symlinks"""
+        total_size = 0
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    # is_dir/is_symlink use the file type readdir already returned
+                    if entry.is_dir(follow_symlinks=False):
+                        total_size += self._dir_size_bytes(entry.path)
+                    elif not entry.is_symlink():
+                        total_size += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            pass  # Removed by a finished repost while we were scanning
+        return total_size
+
+    def _has_media(self):
+        """Return True if the media folder exists and holds anything besides the size index"""
+        index_name = os.path.basename(self._index_path)
+        try:
+            with os.scandir(self.media_folder) as entries:
+                return any(entry.name != index_name for entry in entries)
+        except FileNotFoundError:
+            return False
+
+    def _fs_used_mb(self):
+        """Return the MB in use on the filesystem holding the media folder"""
+        stats = os.statvfs(self.media_folder)
+        return (stats.f_blocks - stats.f_bfree) * stats.f_frsize / (1024 * 1024)
+
+    def _list_folders(self):
+        """List top-level subfolders as (path, ctime, MB) and the folder's total MB, walking only unindexed folders"""
+        folders = []
+        total_size = 0
+        with os.scandir(self.media_folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    with self._size_lock:
+                        size = self._sizes.get(entry.path)
+                    if size is None:
+                        size = self._dir_size_bytes(entry.path)
+                        with self._size_lock:
+                            size = self._sizes.setdefault(entry.path, size)
+                    folders.append((entry.path, entry.stat().st_ctime, size / (1024 * 1024)))
+                    total_size += size
+                elif not entry.is_symlink():
+                    total_size += entry.stat(follow_symlinks=False).st_size
+        # Forget folders that were removed since the last pass
+        listed = {path for path, _, _ in folders}
+        with self._size_lock:
+            for path in [path for path in self._sizes if path not in listed]:
+                del self._sizes[path]
+        return folders, total_size / (1024 * 1024)
+
+    def cleanup_old_media(self):
+        """Remove old media files if folder size exceeds limit; returns the MB freed"""
+        freed = 0
+        # Never queue up behind a pass that is already running
+        if not self._lock.acquire(blocking=False):
+            return freed
+        try:
+            self._passes += 1
+            # Removals are not counted, so the counter only over-estimates; trust it when it
+            # says we are under the limit and rescan periodically to correct the drift
+            estimate = self._size_bytes
+            if (
+                estimate is not None
+                and self._passes % self.rescan_every
+                and estimate <= self.max_folder_size_mb * 1024 * 1024
+            ):
+                self.last_size_mb = estimate / (1024 * 1024)
+                return freed
+            try:
+                if USE_STATVFS:
+                    # MEDIA_FOLDER has a volume of its own: one syscall answers the threshold test
+                    used_size = self._fs_used_mb()
+                    if used_size <= self.max_folder_size_mb:
+                        self.last_size_mb = used_size
+                        return freed
+                rescan = self._passes % self.rescan_every == 0
+                if rescan:
+                    # Periodically re-walk every folder in case the index drifted
+                    with self._size_lock:
+                        self._sizes.clear()
+                folders, current_size = self._list_folders()
+                checked_size = used_size if USE_STATVFS else current_size
+                to_free = checked_size - self.max_folder_size_mb
+                if to_free > 0 and not rescan:
+                    # Files removed after a repost are never subtracted from the index, so
+                    # re-walk every folder once; victims are chosen from these real sizes
+                    with self._size_lock:
+                        self._sizes.clear()
+                    folders, current_size = self._list_folders()
+                    if not USE_STATVFS:
+                        checked_size = current_size
+                    to_free = checked_size - self.max_folder_size_mb
+                if to_free > 0:
+                    log_info(f"Media folder size ({checked_size:.2f}MB) exceeds limit ({self.max_folder_size_mb}MB)")
+                    
+                    # Sort by creation time (oldest first)
+                    folders.sort(key=lambda x: x[1])
+                    
+                    # Pick the oldest folders whose combined size brings us under the limit
+                    victims = []
+                    for folder_path, _, folder_size in folders:
+                        if to_free <= 0:
+                            break
+                        victims.append((folder_path, folder_size))
+                        to_free -= folder_size
+                    
+                    # Unlinks in different folders are independent, so overlap their I/O
+                    if victims:
+                        with ThreadPoolExecutor(max_workers=min(8, len(victims)), thread_name_prefix="media-rmtree") as executor:
+                            futures = {executor.submit(shutil.rmtree, folder_path): (folder_path, folder_size)
+                                       for folder_path, folder_size in victims}
+                            for future in as_completed(futures):
+                                folder_path, folder_size = futures[future]
+                                try:
+                                    future.result()
+                                    log_success(f"Removed old media folder: {os.path.basename(folder_path)}")
+                                    current_size -= folder_size
+                                    freed += folder_size
+                                    with self._size_lock:
+                                        self._sizes.pop(folder_path, None)
+                                except Exception as e:
+                                    log_error(f"Failed to remove folder {folder_path}: {e}")
+                self.last_size_mb = current_size
+                with self._size_lock:
+                    self._size_bytes = int(current_size * 1024 * 1024)
+                self._save_index()
+            except Exception as e:
+                log_error(f"Error during media cleanup: {e}")
+        finally:
+            self._lock.release()
+        return freed
+
+    def monitor_memory(self):
+        """Monitor memory usage and cleanup if needed, checking more often while the folder is busy"""
+        interval = 600
+        while not shutdown_event.is_set():
+            if self._has_media():
+                freed = self.cleanup_old_media()
+            else:
+                freed = 0
+                self.last_size_mb = 0
+            if freed or self.last_size_mb > 0.8 * self.max_folder_size_mb:
+                interval = max(self.min_interval, interval // 2)
+            else:
+                interval = min(self.max_interval, interval * 2)
+            # Downloads wake us early once the folder nears its limit; the poll is the safety net
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+
+def request_shutdown(signum=None, frame=None):
+    """Stop the main loop and wake the media monitor from its wait."""
+    shutdown_event.set()
+    if memory_manager is not None:
+        memory_manager._wakeup.set()
 
 
 def main():
     """Main function to run the reposter."""
+    global memory_manager
     if not USERNAME or not PASSWORD:
         log_error("Instagram credentials not found or invalid!")
         log_info("Please create a .env file with the following content:")
@@ -791,123 +1620,66 @@ def main():
         # Load history from file
         load_history()
 
+        # Start the background cleaner for media files that were locked on removal
+        threading.Thread(target=cleanup_worker, name="media-cleanup", daemon=True).start()
+
+        # Start media folder size monitoring
+        memory_manager = MemoryManager(MEDIA_FOLDER)
+        threading.Thread(target=memory_manager.monitor_memory, name="memory-monitor", daemon=True).start()
+
         log_info(f"Setting up scheduler to check every {CHECK_INTERVAL} minutes.")
 
         # Schedule the check
-        schedule.every(CHECK_INTERVAL).minutes.do(check_and_repost)
+        schedule.every(CHECK_INTERVAL).minutes.do(run_check_in_background)
+
+        # Let `kill`/`docker stop` end the run like Ctrl+C, with history flushed; installed
+        # before the initial check, which can take minutes
+        signal.signal(signal.SIGTERM, request_shutdown)
 
         # Run immediately for the first time
         try:
             log_info("Running initial check_and_repost...")
-            check_and_repost()
+            with check_lock:
+                check_and_repost()
         except Exception as e:
-            log_error(f"Error during initial check_and_repost: {e}")
-            import traceback
-
-            log_error(f"Traceback: {traceback.format_exc()}")
+            log_exception("Error during initial check_and_repost: %s", e)
 
         # Keep the script running
         log_success("Instagram Auto Reposter is now running! Press Ctrl+C to stop.")
         consecutive_errors = 0
-        while True:
+        while not shutdown_event.is_set():
             try:
                 schedule.run_pending()
                 consecutive_errors = 0  # Reset error counter on success
             except Exception as e:
                 consecutive_errors += 1
-                log_error(f"Error in scheduler: {e}")
-                import traceback
-
-                log_error(f"Traceback: {traceback.format_exc()}")
+                log_exception("Error in scheduler: %s", e)
 
                 # If we've had multiple consecutive errors, wait longer before retrying
                 if consecutive_errors > 3:
                     log_warning(
                         f"Multiple consecutive errors ({consecutive_errors}). Waiting 5 minutes before retry."
                     )
-                    time.sleep(300)  # 5 minutes
+                    shutdown_event.wait(300)  # 5 minutes
                 else:
                     log_warning("Error occurred. Waiting 30 seconds before retry.")
-                    time.sleep(30)
-
-            time.sleep(1)
+                    shutdown_event.wait(30)
+            else:
+                # Sleep until the next job is due (capped at a minute); the error
+                # branches above already waited, so they go straight back to run_pending
+                idle_seconds = schedule.idle_seconds()
+                if idle_seconds is None:
+                    idle_seconds = 60
+                shutdown_event.wait(min(max(idle_seconds, 0), 60))
+        log_info("Stopping Instagram Auto Reposter...")
+        finish_pending_work()
     except KeyboardInterrupt:
         log_info("\nStopping Instagram Auto Reposter...")
-        save_history()
+        finish_pending_work()
     except Exception as e:
-        log_error(f"An unexpected error occurred: {e}")
-        import traceback
-
-        log_error(f"Traceback: {traceback.format_exc()}")
-        save_history()
+        log_exception("An unexpected error occurred: %s", e)
+        finish_pending_work()
 
 
 if __name__ == "__main__":
     main()
-
-class MemoryManager:
-    """Manages memory usage and cleanup of media files"""
-    def __init__(self, media_folder, max_folder_size_mb=500):
-        self.media_folder = media_folder
-        self.max_folder_size_mb = max_folder_size_mb
-        self._lock = Lock()
-
-    def get_folder_size(self, folder):
-        """Get total size of folder in MB"""
-        total_size = 0
-        for dirpath, _, filenames in os.walk(folder):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                if not os.path.islink(fp):  # Skip symlinks
-                    total_size += os.path.getsize(fp)
-        return total_size / (1024 * 1024)  # Convert to MB
-
-    def cleanup_old_media(self):
-        """Remove old media files if folder size exceeds limit"""
-        with self._lock:
-            try:
-                current_size = self.get_folder_size(self.media_folder)
-                if current_size > self.max_folder_size_mb:
-                    log_info(f"Media folder size ({current_size:.2f}MB) exceeds limit ({self.max_folder_size_mb}MB)")
-                    
-                    # Get all subfolders with their creation times
-                    folders = []
-                    for item in os.listdir(self.media_folder):
-                        item_path = os.path.join(self.media_folder, item)
-                        if os.path.isdir(item_path):
-                            ctime = os.path.getctime(item_path)
-                            folders.append((item_path, ctime))
-                    
-                    # Sort by creation time (oldest first)
-                    folders.sort(key=lambda x: x[1])
-                    
-                    # Remove oldest folders until we're under the limit
-                    for folder_path, _ in folders:
-                        if self.get_folder_size(self.media_folder) <= self.max_folder_size_mb:
-                            break
-                            
-                        try:
-                            import shutil
-                            shutil.rmtree(folder_path)
-                            log_success(f"Removed old media folder: {os.path.basename(folder_path)}")
-                        except Exception as e:
-                            log_error(f"Failed to remove folder {folder_path}: {e}")
-                            
-                        current_size = self.get_folder_size(self.media_folder)
-                        if current_size <= self.max_folder_size_mb:
-                            break
-            except Exception as e:
-                log_error(f"Error during media cleanup: {e}")
-
-    def monitor_memory(self):
-        """Monitor memory usage and cleanup if needed"""
-        while True:
-            self.cleanup_old_media()
-            time.sleep(3600)  # Check every hour
-
-# Create memory manager instance
-memory_manager = MemoryManager(MEDIA_FOLDER)
-
-# Start memory monitoring in a background thread
-memory_thread = threading.Thread(target=memory_manager.monitor_memory, daemon=True)
-memory_thread.start()